@@ -1,3 +1,4 @@
+import logging
 from flask import Flask
 from flask_cors import CORS
 from routes.pins import pins_bp
@@ -7,6 +8,9 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     
+    # DEBUG enables the upload tracing in utils.file_handler
+    logging.basicConfig(level=Config.LOG_LEVEL)
+    
     # Enable CORS for all routes
     CORS(app)
     
@@ -4,10 +4,27 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Config:
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/carousel')
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    # Redis is only a cache/queue, so give up quickly instead of hanging requests
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '0.5'))
+    IMAGE_QUEUE = 'images'
     UPLOAD_FOLDER = 'uploads'
+    # Base URL stored in front of /uploads/ paths (defaults to the request host).
+    # Set it to the Nginx origin together with USE_X_ACCEL_REDIRECT so image
+    # URLs go through the proxy that serves the files.
+    PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL', '')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    # Uploaded filenames are random and never reused
+    UPLOAD_CACHE_MAX_AGE = 31536000  # 1 year
+    
+    # Hand /uploads/ downloads to Nginx via X-Accel-Redirect. Only used for
+    # requests that Nginx marks with X-Sendfile-Type: X-Accel-Redirect, so
+    # clients hitting Flask directly still get the file body.
+    USE_X_ACCEL_REDIRECT = os.getenv('USE_X_ACCEL_REDIRECT', 'false').lower() == 'true'
+    X_ACCEL_UPLOADS_PREFIX = '/internal_uploads/'
     
     # Create upload directory if it doesn't exist
     if not os.path.exists(UPLOAD_FOLDER):
@@ -0,0 +1,16 @@
+import os
+
+# Gunicorn settings for running the API in production:
+#   gunicorn -c gunicorn.conf.py "app:create_app()"
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+
+# gevent patches socket I/O, so a worker keeps serving other requests
+# while one is waiting on MongoDB or Redis
+worker_class = 'gevent'
+worker_connections = 1000
+
+# The app is deliberately not preloaded: each worker imports it after the
+# fork and after gevent has monkey-patched, so every worker builds its own
+# MongoDB and Redis clients and no sockets are shared with the master
+preload_app = False
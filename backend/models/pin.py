@@ -1,16 +1,85 @@
 from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 from datetime import datetime
 from bson import ObjectId
+import logging
 import os
+from utils.cache import cached_pin, invalidate_pin
+
+log = logging.getLogger(__name__)
+
+# Process-wide MongoDB client, shared by every Pin instance
+_client = None
+
+def get_client(mongodb_uri):
+    """Return the shared MongoClient, creating it on first use"""
+    global _client
+    if _client is None:
+        # connect=False defers opening sockets until the first operation,
+        # so a client created before a worker fork is never shared with it
+        _client = MongoClient(
+            mongodb_uri,
+            maxPoolSize=50,
+            minPoolSize=5,
+            serverSelectionTimeoutMS=2000,
+            appname='carousel',
+            connect=False
+        )
+    return _client
+
+# _id of the document in the meta collection holding pin count/version
+PINS_META_ID = 'pins'
 
 class Pin:
+    _indexes_created = False
+    _meta_initialized = False
+    
     def __init__(self, mongodb_uri):
-        self.client = MongoClient(mongodb_uri)
+        self.client = get_client(mongodb_uri)
         self.db = self.client.carousel
         self.collection = self.db.pins
+        self.meta = self.db.meta
+    
+    def _ensure_setup(self):
+        """Run the one-time setup lazily, so the app boots while MongoDB is down"""
+        # Independent steps: the counter must be seeded even if the index
+        # cannot be created (e.g. the user lacks createIndex rights)
+        self._ensure_indexes()
+        self._ensure_meta()
+    
+    def _ensure_indexes(self):
+        """Create the indexes used by the listing queries (once per process)"""
+        if Pin._indexes_created:
+            return
+        try:
+            # Lets MongoDB walk pins newest-first instead of sorting in memory
+            self.collection.create_index([('created_at', -1)], background=True)
+        except PyMongoError as e:
+            # Leave the flag unset so the next call retries
+            log.warning("Error creating pin indexes: %s", e)
+            return
+        Pin._indexes_created = True
+    
+    def _ensure_meta(self):
+        """Seed the pins counter from the collection if it does not exist yet"""
+        if Pin._meta_initialized:
+            return
+        try:
+            # $setOnInsert leaves an existing counter untouched
+            self.meta.update_one(
+                {'_id': PINS_META_ID},
+                {'$setOnInsert': {'count': self.collection.count_documents({}), 'version': 0}},
+                upsert=True
+            )
+        except PyMongoError as e:
+            # Leave the flag unset so the next call retries
+            log.warning("Error seeding pins meta: %s", e)
+            return
+        Pin._meta_initialized = True
     
     def create_pin(self, title, image_url, tags=None):
         """Create a new pin"""
+        self._ensure_setup()
         pin_data = {
             'title': title,
             'image_url': image_url,
@@ -18,32 +87,56 @@ class Pin:
             'created_at': datetime.utcnow()
         }
         result = self.collection.insert_one(pin_data)
+        # No upsert: if seeding has not happened yet it will count this pin,
+        # while upserting here would create a counter starting from zero
+        self.meta.update_one(
+            {'_id': PINS_META_ID},
+            {'$inc': {'count': 1, 'version': 1}}
+        )
         return str(result.inserted_id)
     
     def get_all_pins(self):
         """Get all pins sorted by creation date (newest first)"""
-        pins = list(self.collection.find().sort('created_at', -1))
-        # Convert ObjectId to string for JSON serialization
-        for pin in pins:
-            pin['_id'] = str(pin['_id'])
-            pin['created_at'] = pin['created_at'].isoformat()
-        return pins
+        self._ensure_setup()
+        # ObjectId and datetime are left as-is and encoded by the response
+        # serializer, so no per-row conversion is needed here
+        return list(self.collection.find().sort('created_at', -1))
+    
+    def get_pins_page(self, skip=0, limit=20):
+        """Get a single page of pins sorted by creation date (newest first)"""
+        self._ensure_setup()
+        cursor = self.collection.find({}, projection={
+            'title': 1,
+            'image_url': 1,
+            'tags': 1,
+            'created_at': 1
+        }).sort('created_at', -1).skip(skip).limit(limit)
+        return list(cursor)
     
+    def get_pins_meta(self):
+        """Get the pin count and version (bumped on every insert/delete)"""
+        self._ensure_setup()
+        meta = self.meta.find_one({'_id': PINS_META_ID}) or {}
+        return {'count': meta.get('count', 0), 'version': meta.get('version', 0)}
+    
+    @cached_pin
     def get_pin_by_id(self, pin_id):
         """Get a specific pin by ID"""
-        try:
-            pin = self.collection.find_one({'_id': ObjectId(pin_id)})
-            if pin:
-                pin['_id'] = str(pin['_id'])
-                pin['created_at'] = pin['created_at'].isoformat()
-            return pin
-        except:
+        if not ObjectId.is_valid(pin_id):
             return None
+        return self.collection.find_one({'_id': ObjectId(pin_id)})
     
     def delete_pin(self, pin_id):
         """Delete a pin by ID"""
-        try:
-            result = self.collection.delete_one({'_id': ObjectId(pin_id)})
-            return result.deleted_count > 0
-        except:
-            return False
\ No newline at end of file
+        if not ObjectId.is_valid(pin_id):
+            return False
+        self._ensure_setup()
+        result = self.collection.delete_one({'_id': ObjectId(pin_id)})
+        if result.deleted_count == 0:
+            return False
+        self.meta.update_one(
+            {'_id': PINS_META_ID},
+            {'$inc': {'count': -1, 'version': 1}}
+        )
+        invalidate_pin(pin_id)
+        return True
\ No newline at end of file
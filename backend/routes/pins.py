@@ -1,11 +1,33 @@
-from flask import Blueprint, request, jsonify, send_from_directory
+from flask import Blueprint, Response, abort, request, send_from_directory
+from werkzeug.security import safe_join
+import orjson
 from models.pin import Pin
-from utils.file_handler import save_uploaded_file
+from utils.file_handler import is_optimized, save_uploaded_file, save_uploaded_stream, webp_variant_name
+from utils.responses import dumps, ojson, ojson_bytes
+from utils.cache import IMAGES_CACHE_TTL, cache_get, cache_set, images_cache_key
 from config import Config
+import logging
+import mimetypes
 import os
+import re
+
+log = logging.getLogger(__name__)
 
 pins_bp = Blueprint('pins', __name__)
 
+# Largest page /api/images will fetch, whatever limit the client asks for
+MAX_PAGE_LIMIT = 100
+
+def public_image_url(image_url):
+    """Turn a relative /uploads/ path into the absolute URL stored on the pin"""
+    if not image_url.startswith('/uploads/'):
+        return image_url
+    base_url = Config.PUBLIC_BASE_URL or request.host_url
+    return base_url.rstrip('/') + image_url
+
+# Matches one comma-separated tag with surrounding whitespace trimmed
+_TAG_RE = re.compile(r'[^,\s](?:[^,]*[^,\s])?')
+
 # Initialize Pin model
 pin_model = Pin(Config.MONGODB_URI)
 
@@ -14,9 +36,9 @@ def get_pins():
     """Get all pins"""
     try:
         pins = pin_model.get_all_pins()
-        return jsonify({'success': True, 'pins': pins})
+        return ojson({'success': True, 'pins': pins})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojson({'success': False, 'error': str(e)}, 500)
 
 @pins_bp.route('/api/pins', methods=['POST'])
 def create_pin():
@@ -24,7 +46,7 @@ def create_pin():
     try:
         # Check if request has file part
         if 'image' not in request.files:
-            return jsonify({'success': False, 'error': 'No image file provided'}), 400
+            return ojson({'success': False, 'error': 'No image file provided'}, 400)
         
         file = request.files['image']
         title = request.form.get('title', '').strip()
@@ -32,36 +54,33 @@ def create_pin():
         
         # Validate inputs
         if not title:
-            return jsonify({'success': False, 'error': 'Title is required'}), 400
+            return ojson({'success': False, 'error': 'Title is required'}, 400)
         
         if file.filename == '':
-            return jsonify({'success': False, 'error': 'No image selected'}), 400
+            return ojson({'success': False, 'error': 'No image selected'}, 400)
         
         # Save file
         image_url = save_uploaded_file(file)
         if not image_url:
-            return jsonify({'success': False, 'error': 'Invalid file format'}), 400
+            return ojson({'success': False, 'error': 'Invalid file format'}, 400)
         
-        # Convert relative URL to full URL for frontend
-        if image_url.startswith('/uploads/'):
-            full_image_url = f"http://localhost:5001{image_url}"
-        else:
-            full_image_url = image_url
+        # Store the absolute URL so listings can return it as-is
+        full_image_url = public_image_url(image_url)
         
         # Process tags
-        tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()] if tags else []
+        tag_list = _TAG_RE.findall(tags)
         
         # Create pin in database
-        pin_id = pin_model.create_pin(title, image_url, tag_list)
+        pin_id = pin_model.create_pin(title, full_image_url, tag_list)
         
-        return jsonify({
+        return ojson({
             'success': True, 
             'message': 'Pin created successfully',
             'pin_id': pin_id
-        }), 201
+        }, 201)
     
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojson({'success': False, 'error': str(e)}, 500)
 
 @pins_bp.route('/api/pins/<pin_id>', methods=['GET'])
 def get_pin(pin_id):
@@ -69,11 +88,11 @@ def get_pin(pin_id):
     try:
         pin = pin_model.get_pin_by_id(pin_id)
         if pin:
-            return jsonify({'success': True, 'pin': pin})
+            return ojson({'success': True, 'pin': pin})
         else:
-            return jsonify({'success': False, 'error': 'Pin not found'}), 404
+            return ojson({'success': False, 'error': 'Pin not found'}, 404)
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojson({'success': False, 'error': str(e)}, 500)
 
 @pins_bp.route('/api/pins/<pin_id>', methods=['DELETE'])
 def delete_pin(pin_id):
@@ -81,16 +100,61 @@ def delete_pin(pin_id):
     try:
         success = pin_model.delete_pin(pin_id)
         if success:
-            return jsonify({'success': True, 'message': 'Pin deleted successfully'})
+            return ojson({'success': True, 'message': 'Pin deleted successfully'})
         else:
-            return jsonify({'success': False, 'error': 'Pin not found'}), 404
+            return ojson({'success': False, 'error': 'Pin not found'}, 404)
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojson({'success': False, 'error': str(e)}, 500)
 
 @pins_bp.route('/uploads/<filename>')
 def uploaded_file(filename):
     """Serve uploaded files"""
-    return send_from_directory(Config.UPLOAD_FOLDER, filename)
+    if safe_join(Config.UPLOAD_FOLDER, filename) is None:
+        abort(404)
+    
+    # Prefer the WebP copy when the client accepts it; fall back to the
+    # original format otherwise
+    served_filename = filename
+    webp_filename = webp_variant_name(filename)
+    negotiated = webp_filename != filename
+    webp_exists = negotiated and os.path.exists(os.path.join(Config.UPLOAD_FOLDER, webp_filename))
+    if webp_exists and 'image/webp' in request.headers.get('Accept', ''):
+        served_filename = webp_filename
+    
+    # The background optimizer replaces the file once, so it is only final
+    # after that has happened. A WebP copy without a marker comes from
+    # uploads optimized before the marker was introduced.
+    final = webp_exists or is_optimized(os.path.join(Config.UPLOAD_FOLDER, filename))
+    
+    use_x_accel = (
+        Config.USE_X_ACCEL_REDIRECT and
+        request.headers.get('X-Sendfile-Type') == 'X-Accel-Redirect'
+    )
+    if use_x_accel:
+        # Let Nginx send the file with sendfile(2); no bytes pass through Python
+        response = Response(status=200)
+        response.headers['X-Accel-Redirect'] = f"{Config.X_ACCEL_UPLOADS_PREFIX}{served_filename}"
+        response.headers['Content-Type'] = mimetypes.guess_type(served_filename)[0] or 'application/octet-stream'
+    else:
+        # conditional=True adds an ETag and answers If-None-Match with 304.
+        # max_age also sets Expires, so only pass it once the file is final.
+        response = send_from_directory(
+            Config.UPLOAD_FOLDER,
+            served_filename,
+            conditional=True,
+            max_age=Config.UPLOAD_CACHE_MAX_AGE if final else None
+        )
+    
+    # Until the file is final clients revalidate and get a 304 if nothing
+    # changed
+    if final:
+        response.headers['Cache-Control'] = f"public, max-age={Config.UPLOAD_CACHE_MAX_AGE}, immutable"
+    else:
+        response.headers['Cache-Control'] = 'public, no-cache'
+    
+    if negotiated:
+        response.headers['Vary'] = 'Accept'
+    return response
 
 # ===== NEW ENDPOINTS FOR FRONTEND INTEGRATION =====
 
@@ -98,7 +162,22 @@ def uploaded_file(filename):
 def get_images():
     """Get all images for the gallery (maps to pins for frontend compatibility)"""
     try:
-        pins = pin_model.get_all_pins()
+        # Get pagination parameters
+        page = max(request.args.get('page', 1, type=int), 1)
+        limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_PAGE_LIMIT)
+        
+        # The version changes on every insert/delete, so a cached page is
+        # never served once the pins it was built from have changed
+        meta = pin_model.get_pins_meta()
+        total = meta['count']
+        cache_key = images_cache_key(page, limit, meta['version'])
+        cached = cache_get(cache_key)
+        if cached:
+            return ojson_bytes(cached)
+        
+        # Let MongoDB do the paging so only one page is fetched
+        skip = (page - 1) * limit
+        pins = pin_model.get_pins_page(skip, limit)
         
         # Transform pins to match frontend expectations
         images = []
@@ -106,18 +185,14 @@ def get_images():
             # Handle different possible ID formats
             pin_id = str(pin.get('_id', pin.get('id', '')))
             
-            # Get image URL and convert to full URL
-            image_url = pin.get('image_url', '')
-            if image_url and image_url.startswith('/uploads/'):
-                # Convert relative URL to full backend URL
-                full_image_url = f"http://localhost:5001{image_url}"
-            else:
-                full_image_url = image_url
+            # Stored as an absolute URL at upload time; pins created before
+            # that still hold a relative /uploads/ path
+            image_url = public_image_url(pin.get('image_url', ''))
             
             images.append({
                 "id": pin_id,
-                "url": full_image_url,
-                "thumbnail": full_image_url,  # Use same URL for thumbnail
+                "url": image_url,
+                "thumbnail": image_url,  # Use same URL for thumbnail
                 "title": pin.get('title', ''),
                 "description": pin.get('description', ''),
                 "tags": pin.get('tags', []),
@@ -128,34 +203,26 @@ def get_images():
                 "views": pin.get('views', 0)
             })
         
-        # Get pagination parameters
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 20, type=int)
-        
-        # Calculate pagination
-        total = len(images)
-        start = (page - 1) * limit
-        end = start + limit
-        paginated_images = images[start:end]
-        
-        return jsonify({
-            "images": paginated_images,
+        body = dumps({
+            "images": images,
             "total": total,
             "page": page,
             "totalPages": (total + limit - 1) // limit,  # Ceiling division
-            "hasMore": end < total
+            "hasMore": skip + len(images) < total
         })
+        cache_set(cache_key, body, IMAGES_CACHE_TTL)
+        return ojson_bytes(body)
         
     except Exception as e:
-        print(f"Error fetching images: {str(e)}")  # Debug logging
-        return jsonify({
+        log.exception("Error fetching images: %s", e)
+        return ojson({
             "images": [],
             "total": 0,
             "page": 1,
             "totalPages": 0,
             "hasMore": False,
             "error": str(e)
-        }), 500
+        }, 500)
 
 @pins_bp.route('/api/upload', methods=['POST'])
 def upload_image():
@@ -163,7 +230,7 @@ def upload_image():
     try:
         # Check if request has file part
         if 'image' not in request.files:
-            return jsonify({'success': False, 'error': 'No image file provided'}), 400
+            return ojson({'success': False, 'error': 'No image file provided'}, 400)
         
         file = request.files['image']
         title = request.form.get('title', '').strip()
@@ -175,35 +242,33 @@ def upload_image():
             title = file.filename or 'Untitled'
         
         if file.filename == '':
-            return jsonify({'success': False, 'error': 'No image selected'}), 400
+            return ojson({'success': False, 'error': 'No image selected'}, 400)
         
         # Save file
         image_url = save_uploaded_file(file)
         if not image_url:
-            return jsonify({'success': False, 'error': 'Invalid file format'}), 400
+            return ojson({'success': False, 'error': 'Invalid file format'}, 400)
         
-        # FIX: Convert relative URL to full URL (this was missing!)
-        if image_url.startswith('/uploads/'):
-            full_image_url = f"http://localhost:5001{image_url}"
-        else:
-            full_image_url = image_url
+        # Store the absolute URL so listings can return it as-is
+        full_image_url = public_image_url(image_url)
         
         # Process tags - handle both comma-separated strings and JSON arrays
+        # (tags_input is already stripped, so a JSON array starts with '[')
         tag_list = []
-        if tags_input:
+        if tags_input.startswith('['):
             try:
-                # Try to parse as JSON array first
-                import json
-                tag_list = json.loads(tags_input)
-            except:
-                # Fallback to comma-separated string
-                tag_list = [tag.strip() for tag in tags_input.split(',') if tag.strip()]
+                tag_list = orjson.loads(tags_input)
+            except orjson.JSONDecodeError:
+                # Not valid JSON after all, treat it as comma-separated
+                tag_list = _TAG_RE.findall(tags_input)
+        elif tags_input:
+            tag_list = _TAG_RE.findall(tags_input)
         
         # Create pin in database
-        pin_id = pin_model.create_pin(title, image_url, tag_list)
+        pin_id = pin_model.create_pin(title, full_image_url, tag_list)
         
         # Return frontend-compatible response
-        return jsonify({
+        return ojson({
             'id': str(pin_id),
             'url': full_image_url,  # Now this variable exists!
             'title': title,
@@ -212,22 +277,60 @@ def upload_image():
             'uploadDate': '',  # Will be set by the database
             'size': 0,  # Could calculate actual file size if needed
             'filename': file.filename
-        }), 201
+        }, 201)
+    
+    except Exception as e:
+        log.exception("Error uploading image: %s", e)
+        return ojson({'success': False, 'error': str(e)}, 500)
+
+@pins_bp.route('/api/upload/raw', methods=['POST', 'PUT'])
+def upload_raw_image():
+    """Upload a single image sent as the raw request body (no multipart)"""
+    try:
+        title = request.args.get('title', '').strip() or 'Untitled'
+        description = request.args.get('description', '').strip()
+        tags_input = request.args.get('tags', '').strip()
+        
+        # Save file
+        image_url = save_uploaded_stream(request.stream, request.headers.get('Content-Type'))
+        if not image_url:
+            return ojson({'success': False, 'error': 'Invalid file format'}, 400)
+        
+        # Store the absolute URL so listings can return it as-is
+        full_image_url = public_image_url(image_url)
+        
+        # Process tags
+        tag_list = _TAG_RE.findall(tags_input)
+        
+        # Create pin in database
+        pin_id = pin_model.create_pin(title, full_image_url, tag_list)
+        
+        return ojson({
+            'id': str(pin_id),
+            'url': full_image_url,
+            'title': title,
+            'description': description,
+            'tags': tag_list,
+            'uploadDate': '',
+            'size': 0,
+            'filename': image_url.rsplit('/', 1)[-1]
+        }, 201)
     
     except Exception as e:
-        print(f"Error uploading image: {str(e)}")  # Debug logging
-        return jsonify({'success': False, 'error': str(e)}), 500
+        log.exception("Error uploading image: %s", e)
+        return ojson({'success': False, 'error': str(e)}, 500)
 
 
 @pins_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return ojson({
         "status": "healthy",
         "message": "Pins API is running!",
         "endpoints": [
             "/api/pins",
             "/api/images", 
-            "/api/upload"
+            "/api/upload",
+            "/api/upload/raw"
         ]
     })
\ No newline at end of file
@@ -0,0 +1,65 @@
+import pytest
+from utils import cache
+from utils.cache import cached_pin, invalidate_pin
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+    
+    def get(self, key):
+        return self.data.get(key)
+    
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+class FakeModel:
+    def __init__(self, pins):
+        self.pins = pins
+        self.lookups = 0
+        self.on_lookup = None
+    
+    @cached_pin
+    def get_pin_by_id(self, pin_id):
+        self.lookups += 1
+        pin = self.pins.get(pin_id)
+        if self.on_lookup:
+            self.on_lookup()
+        return pin
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(cache, 'redis_conn', fake)
+    return fake
+
+def test_pin_is_served_from_cache():
+    model = FakeModel({'a': {'_id': 'a', 'title': 'Sunset'}})
+    
+    assert model.get_pin_by_id('a') == {'_id': 'a', 'title': 'Sunset'}
+    assert model.get_pin_by_id('a') == {'_id': 'a', 'title': 'Sunset'}
+    assert model.lookups == 1
+
+def test_deleted_pin_is_not_served_from_cache():
+    model = FakeModel({'a': {'_id': 'a', 'title': 'Sunset'}})
+    model.get_pin_by_id('a')
+    
+    del model.pins['a']
+    invalidate_pin('a')
+    
+    assert model.get_pin_by_id('a') is None
+
+def test_delete_during_miss_does_not_recache_pin():
+    model = FakeModel({'a': {'_id': 'a', 'title': 'Sunset'}})
+    
+    # The delete lands after the lookup read the pin but before it is cached
+    def delete_pin():
+        del model.pins['a']
+        invalidate_pin('a')
+    model.on_lookup = delete_pin
+    model.get_pin_by_id('a')
+    model.on_lookup = None
+    
+    assert model.get_pin_by_id('a') is None
@@ -0,0 +1,43 @@
+import os
+import pytest
+from PIL import Image
+from utils import file_handler
+from utils.file_handler import optimize_image_pillow, optimize_image_vips, webp_variant_name
+
+OPTIMIZERS = [
+    pytest.param(optimize_image_pillow, id='pillow'),
+    pytest.param(
+        optimize_image_vips,
+        id='vips',
+        marks=pytest.mark.skipif(file_handler.pyvips is None, reason='libvips not available')
+    )
+]
+
+def make_image(path, fmt, size=(1600, 1200)):
+    Image.new('RGB', size, (200, 80, 40)).save(path, format=fmt)
+    return str(path)
+
+@pytest.mark.parametrize('optimizer', OPTIMIZERS)
+@pytest.mark.parametrize('filename,fmt', [('photo.jpg', 'JPEG'), ('photo.png', 'PNG')])
+def test_optimizer_resizes_and_writes_webp(tmp_path, optimizer, filename, fmt):
+    file_path = make_image(tmp_path / filename, fmt)
+    
+    optimizer(file_path)
+    
+    with Image.open(file_path) as img:
+        assert max(img.size) <= 800
+    webp_path = webp_variant_name(file_path)
+    assert os.path.exists(webp_path)
+    with Image.open(webp_path) as img:
+        assert img.format == 'WEBP'
+    assert sorted(os.listdir(tmp_path)) == sorted([filename, os.path.basename(webp_path)])
+
+@pytest.mark.parametrize('optimizer', OPTIMIZERS)
+def test_optimizer_leaves_no_temp_files_on_failure(tmp_path, optimizer):
+    file_path = tmp_path / 'broken.jpg'
+    file_path.write_bytes(b'not an image')
+    
+    optimizer(str(file_path))
+    
+    assert os.listdir(tmp_path) == ['broken.jpg']
+    assert file_path.read_bytes() == b'not an image'
@@ -0,0 +1,24 @@
+from datetime import datetime
+import pytest
+from app import create_app
+from config import Config
+from routes import pins
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(Config, 'PUBLIC_BASE_URL', 'http://images.example')
+    monkeypatch.setattr(pins, 'cache_get', lambda key: None)
+    monkeypatch.setattr(pins, 'cache_set', lambda key, value, ttl: None)
+    monkeypatch.setattr(pins.pin_model, 'get_pins_meta', lambda: {'count': 2, 'version': 1})
+    monkeypatch.setattr(pins.pin_model, 'get_pins_page', lambda skip, limit: [
+        {'_id': 'new', 'title': 'New', 'image_url': 'http://cdn.example/uploads/new.jpg', 'created_at': datetime(2026, 1, 2)},
+        {'_id': 'old', 'title': 'Old', 'image_url': '/uploads/old.jpg', 'created_at': datetime(2026, 1, 1)}
+    ])
+    return create_app().test_client()
+
+def test_images_keep_absolute_urls_and_fix_up_legacy_paths(client):
+    images = client.get('/api/images').get_json()['images']
+    
+    assert images[0]['url'] == 'http://cdn.example/uploads/new.jpg'
+    assert images[1]['url'] == 'http://images.example/uploads/old.jpg'
+    assert images[1]['thumbnail'] == images[1]['url']
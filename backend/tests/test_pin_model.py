@@ -0,0 +1,59 @@
+import pytest
+from pymongo.errors import OperationFailure
+from models.pin import PINS_META_ID, Pin
+
+class FakeResult:
+    inserted_id = 'new-id'
+
+class FakePins:
+    def __init__(self, count):
+        self.count = count
+    
+    def create_index(self, *args, **kwargs):
+        raise OperationFailure('not authorized to create indexes')
+    
+    def count_documents(self, query):
+        return self.count
+    
+    def insert_one(self, document):
+        self.count += 1
+        return FakeResult()
+
+class FakeMeta:
+    def __init__(self):
+        self.documents = {}
+    
+    def update_one(self, query, update, upsert=False):
+        document = self.documents.get(query['_id'])
+        if document is None:
+            if not upsert:
+                return
+            document = self.documents[query['_id']] = dict(update.get('$setOnInsert', {}))
+        for field, amount in update.get('$inc', {}).items():
+            document[field] = document.get(field, 0) + amount
+    
+    def find_one(self, query):
+        return self.documents.get(query['_id'])
+
+@pytest.fixture
+def pin_model(monkeypatch):
+    monkeypatch.setattr(Pin, '_indexes_created', False)
+    monkeypatch.setattr(Pin, '_meta_initialized', False)
+    model = Pin('mongodb://localhost:27017/carousel')
+    model.collection = FakePins(count=5)
+    model.meta = FakeMeta()
+    return model
+
+def test_counter_is_seeded_when_index_creation_fails(pin_model):
+    pin_model.create_pin('Sunset', 'http://example/uploads/a.jpg')
+    
+    assert pin_model.get_pins_meta() == {'count': 6, 'version': 1}
+    assert Pin._indexes_created is False
+    assert pin_model.meta.documents[PINS_META_ID]['count'] == pin_model.collection.count
+
+def test_insert_does_not_create_counter_before_seeding(pin_model, monkeypatch):
+    monkeypatch.setattr(Pin, '_ensure_setup', lambda self: None)
+    
+    pin_model.create_pin('Sunset', 'http://example/uploads/a.jpg')
+    
+    assert PINS_META_ID not in pin_model.meta.documents
@@ -0,0 +1,90 @@
+import pytest
+from PIL import Image
+from app import create_app
+from config import Config
+from utils.file_handler import optimize_image
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(Config, 'USE_X_ACCEL_REDIRECT', False)
+    return create_app().test_client()
+
+def test_pending_upload_is_revalidated(client, tmp_path):
+    (tmp_path / 'photo.jpg').write_bytes(b'original')
+    
+    response = client.get('/uploads/photo.jpg')
+    
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'public, no-cache'
+    assert 'Expires' not in response.headers
+    assert response.headers['ETag']
+
+def test_optimized_upload_is_immutable(client, tmp_path):
+    (tmp_path / 'photo.jpg').write_bytes(b'optimized')
+    (tmp_path / 'photo.webp').write_bytes(b'webp')
+    
+    response = client.get('/uploads/photo.jpg')
+    
+    assert response.headers['Cache-Control'] == f"public, max-age={Config.UPLOAD_CACHE_MAX_AGE}, immutable"
+    assert 'Expires' in response.headers
+    assert response.get_data() == b'optimized'
+
+def test_webp_is_served_when_accepted(client, tmp_path):
+    (tmp_path / 'photo.jpg').write_bytes(b'optimized')
+    (tmp_path / 'photo.webp').write_bytes(b'webp')
+    
+    response = client.get('/uploads/photo.jpg', headers={'Accept': 'image/webp,*/*'})
+    
+    assert response.get_data() == b'webp'
+    assert response.mimetype == 'image/webp'
+    assert response.headers['Vary'] == 'Accept'
+
+def test_repeat_request_is_not_modified(client, tmp_path):
+    (tmp_path / 'photo.jpg').write_bytes(b'original')
+    etag = client.get('/uploads/photo.jpg').headers['ETag']
+    
+    response = client.get('/uploads/photo.jpg', headers={'If-None-Match': etag})
+    
+    assert response.status_code == 304
+
+def test_x_accel_redirect_only_behind_nginx(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'USE_X_ACCEL_REDIRECT', True)
+    (tmp_path / 'photo.jpg').write_bytes(b'original')
+    
+    direct = client.get('/uploads/photo.jpg')
+    proxied = client.get('/uploads/photo.jpg', headers={'X-Sendfile-Type': 'X-Accel-Redirect'})
+    
+    assert direct.get_data() == b'original'
+    assert 'X-Accel-Redirect' not in direct.headers
+    assert proxied.get_data() == b''
+    assert proxied.headers['X-Accel-Redirect'] == f"{Config.X_ACCEL_UPLOADS_PREFIX}photo.jpg"
+    assert proxied.mimetype == 'image/jpeg'
+
+def test_optimized_webp_upload_is_immutable(client, tmp_path):
+    file_path = tmp_path / 'photo.webp'
+    Image.new('RGB', (1200, 900)).save(file_path, format='WEBP')
+    
+    pending = client.get('/uploads/photo.webp')
+    optimize_image(str(file_path))
+    optimized = client.get('/uploads/photo.webp')
+    
+    assert pending.headers['Cache-Control'] == 'public, no-cache'
+    assert optimized.headers['Cache-Control'] == f"public, max-age={Config.UPLOAD_CACHE_MAX_AGE}, immutable"
+    assert 'Vary' not in optimized.headers
+
+def test_upload_that_failed_to_optimize_is_immutable(client, tmp_path):
+    file_path = tmp_path / 'broken.gif'
+    file_path.write_bytes(b'not an image')
+    
+    optimize_image(str(file_path))
+    response = client.get('/uploads/broken.gif')
+    
+    assert response.get_data() == b'not an image'
+    assert response.headers['Cache-Control'] == f"public, max-age={Config.UPLOAD_CACHE_MAX_AGE}, immutable"
+
+def test_marker_folder_is_not_served(client, tmp_path):
+    (tmp_path / 'photo.jpg').write_bytes(b'original')
+    optimize_image(str(tmp_path / 'photo.jpg'))
+    
+    assert client.get('/uploads/.optimized/photo.jpg').status_code == 404
@@ -0,0 +1,61 @@
+import functools
+import logging
+import orjson
+from redis.exceptions import RedisError
+from utils.redis_client import redis_conn
+from utils.responses import dumps
+
+log = logging.getLogger(__name__)
+
+# Safety net for cached /api/images pages
+IMAGES_CACHE_TTL = 60
+
+# How long a single pin stays cached
+PIN_CACHE_TTL = 300
+
+# Cached in place of a deleted pin (JSON null, so a hit returns None)
+PIN_TOMBSTONE = b'null'
+
+def images_cache_key(page, limit, version):
+    """Build the cache key for one page of /api/images"""
+    return f"images:{page}:{limit}:{version}"
+
+def cache_get(key):
+    """Get cached bytes, or None on a miss or if Redis is unavailable"""
+    try:
+        return redis_conn.get(key)
+    except RedisError as e:
+        log.warning("Error reading cache: %s", e)
+        return None
+
+def cache_set(key, value, ttl, nx=False):
+    """Store bytes in the cache, ignoring Redis failures"""
+    try:
+        redis_conn.set(key, value, ex=ttl, nx=nx)
+    except RedisError as e:
+        log.warning("Error writing cache: %s", e)
+
+def pin_cache_key(pin_id):
+    """Build the cache key for a single pin"""
+    return f"pin:{pin_id}"
+
+def cached_pin(func):
+    """Cache the pin returned by a (self, pin_id) lookup in Redis"""
+    @functools.wraps(func)
+    def wrapper(self, pin_id):
+        key = pin_cache_key(pin_id)
+        cached = cache_get(key)
+        if cached is not None:
+            return orjson.loads(cached)
+        
+        pin = func(self, pin_id)
+        if pin:
+            # nx so a miss that read the pin just before it was deleted
+            # cannot overwrite the tombstone left by invalidate_pin
+            cache_set(key, dumps(pin), PIN_CACHE_TTL, nx=True)
+        return pin
+    return wrapper
+
+def invalidate_pin(pin_id):
+    """Replace a cached pin with a tombstone so it reads as deleted"""
+    cache_set(pin_cache_key(pin_id), PIN_TOMBSTONE, PIN_CACHE_TTL)
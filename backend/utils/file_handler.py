@@ -1,43 +1,188 @@
+import base64
+import logging
 import os
-import uuid
 from werkzeug.utils import secure_filename
 from PIL import Image
 from config import Config
+from utils.tasks import enqueue_optimize_image
+
+log = logging.getLogger(__name__)
+
+try:
+    import pyvips
+except (ImportError, OSError):
+    # pyvips is missing or libvips itself could not be loaded
+    pyvips = None
+
+# Save options for libvips, keyed by output suffix
+VIPS_SAVE_OPTIONS = {
+    '.jpg': {'Q': 85, 'strip': True, 'optimize_coding': True},
+    '.jpeg': {'Q': 85, 'strip': True, 'optimize_coding': True},
+    '.webp': {'Q': 85, 'strip': True},
+    '.png': {'strip': True},
+    '.gif': {}
+}
+
+# WebP copy written next to every optimized upload
+WEBP_QUALITY = 82
+WEBP_EFFORT = 4
+
+# Subfolder of the upload folder holding an empty marker per finished
+# upload (not reachable through /uploads/<filename>)
+OPTIMIZED_MARKER_FOLDER = '.optimized'
+
+# Extensions for raw (non-multipart) uploads, keyed by Content-Type
+CONTENT_TYPE_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/gif': 'gif',
+    'image/webp': 'webp'
+}
+
+# Block size used when streaming raw uploads to disk
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Allowed extensions as suffixes, for a single str.endswith() check
+ALLOWED_SUFFIXES = tuple('.' + ext for ext in Config.ALLOWED_EXTENSIONS)
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
 
 def save_uploaded_file(file):
     """Save uploaded file and return the file path"""
-    print(f"DEBUG: File received: {file}, Filename: {file.filename if file else None}")
+    log.debug("File received: %s, Filename: %s", file, file.filename if file else None)
     
     if file and file.filename:
         result = allowed_file(file.filename)
-        print(f"DEBUG: File allowed: {result}")
+        log.debug("File allowed: %s", result)
         
         if result:
             # Generate unique filename
             file_extension = file.filename.rsplit('.', 1)[1].lower()
-            unique_filename = f"{uuid.uuid4()}.{file_extension}"
+            unique_filename, file_path = unique_upload_path(file_extension)
             
             # Save file
-            file_path = os.path.join(Config.UPLOAD_FOLDER, unique_filename)
-            print(f"DEBUG: Saving to: {file_path}")
+            log.debug("Saving to: %s", file_path)
             file.save(file_path)
             
-            # Optimize image
-            optimize_image(file_path)
+            # Optimize in the background; the original is served until the
+            # optimized file replaces it. Optimize inline if Redis is down.
+            if not enqueue_optimize_image(file_path):
+                optimize_image(file_path)
             
             return f"/uploads/{unique_filename}"
     
-    print("DEBUG: File validation failed")
+    log.debug("File validation failed")
     return None
 
+def save_uploaded_stream(stream, content_type):
+    """Stream a raw request body to disk and return the file path"""
+    mimetype = (content_type or '').split(';', 1)[0].strip().lower()
+    file_extension = CONTENT_TYPE_EXTENSIONS.get(mimetype)
+    if not file_extension:
+        return None
+    
+    unique_filename, file_path = unique_upload_path(file_extension)
+    
+    # Write each block straight to the file descriptor, skipping the
+    # multipart parser and the extra copy made by FileStorage.save()
+    fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        while True:
+            chunk = stream.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            view = memoryview(chunk)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+    except Exception:
+        os.close(fd)
+        os.remove(file_path)
+        raise
+    os.close(fd)
+    
+    if os.path.getsize(file_path) == 0:
+        os.remove(file_path)
+        return None
+    
+    if not enqueue_optimize_image(file_path):
+        optimize_image(file_path)
+    
+    return f"/uploads/{unique_filename}"
+
+def unique_upload_path(file_extension):
+    """Generate a unique filename and its path in the upload folder"""
+    # 96 random bits, URL-safe, 16 characters
+    unique_filename = base64.urlsafe_b64encode(os.urandom(12)).decode() + '.' + file_extension
+    return unique_filename, os.path.join(Config.UPLOAD_FOLDER, unique_filename)
+
+def webp_variant_name(filename):
+    """Name of the WebP copy stored next to an upload"""
+    return os.path.splitext(filename)[0] + '.webp'
+
+def optimized_marker_path(file_path):
+    """Path of the marker recording that an upload will not change again"""
+    folder, filename = os.path.split(file_path)
+    return os.path.join(folder, OPTIMIZED_MARKER_FOLDER, filename)
+
+def is_optimized(file_path):
+    """Check whether an upload has been through optimize_image"""
+    return os.path.exists(optimized_marker_path(file_path))
+
+def mark_optimized(file_path):
+    """Record that an upload is final, whatever the optimizer produced"""
+    marker_path = optimized_marker_path(file_path)
+    try:
+        os.makedirs(os.path.dirname(marker_path), exist_ok=True)
+        open(marker_path, 'a').close()
+    except OSError as e:
+        log.error("Error marking image %s as optimized: %s", file_path, e)
+
 def optimize_image(file_path, max_size=(800, 800)):
     """Optimize image size and quality"""
+    if pyvips is not None:
+        optimize_image_vips(file_path, max_size)
+    else:
+        optimize_image_pillow(file_path, max_size)
+    
+    # Also marked when optimization failed: the original is then kept as-is
+    mark_optimized(file_path)
+
+def optimize_image_vips(file_path, max_size=(800, 800)):
+    """Optimize image with libvips (shrink-on-load, streaming resize)"""
+    root, ext = os.path.splitext(file_path)
+    tmp_path = f"{root}.tmp{ext}"
+    webp_tmp_path = f"{root}.tmp.webp"
+    try:
+        # Only shrinks, never enlarges, and decodes JPEGs at reduced scale.
+        # The pipeline is sequential, so render it to memory once before
+        # writing two outputs from it.
+        img = pyvips.Image.thumbnail(file_path, max_size[0], height=max_size[1], size='down')
+        img = img.copy_memory()
+        img.write_to_file(tmp_path, **VIPS_SAVE_OPTIONS.get(ext.lower(), {}))
+        
+        # Also keep a WebP copy for clients that accept it
+        if ext.lower() != '.webp':
+            img.webpsave(webp_tmp_path, Q=WEBP_QUALITY, effort=WEBP_EFFORT, strip=True)
+        
+        replace_optimized(file_path, tmp_path, webp_tmp_path)
+    except Exception as e:
+        log.error("Error optimizing image %s: %s", file_path, e)
+        remove_temp_files(tmp_path, webp_tmp_path)
+
+def optimize_image_pillow(file_path, max_size=(800, 800)):
+    """Optimize image with Pillow (used when libvips is unavailable)"""
+    root, ext = os.path.splitext(file_path)
+    tmp_path = f"{root}.tmp{ext}"
+    webp_tmp_path = f"{root}.tmp.webp"
     try:
         with Image.open(file_path) as img:
+            # Let libjpeg scale down by 1/2, 1/4 or 1/8 while decoding
+            if img.format == 'JPEG':
+                img.draft('RGB', max_size)
+            
             # Convert to RGB if necessary
             if img.mode in ('RGBA', 'P'):
                 img = img.convert('RGB')
@@ -46,6 +191,27 @@ def optimize_image(file_path, max_size=(800, 800)):
             img.thumbnail(max_size, Image.Resampling.LANCZOS)
             
             # Save with optimized quality
-            img.save(file_path, optimize=True, quality=85)
+            img.save(tmp_path, optimize=True, quality=85)
+            
+            # Also keep a WebP copy for clients that accept it
+            if ext.lower() != '.webp':
+                img.save(webp_tmp_path, format='WEBP', quality=WEBP_QUALITY, method=WEBP_EFFORT)
+        
+        replace_optimized(file_path, tmp_path, webp_tmp_path)
     except Exception as e:
-        print(f"Error optimizing image: {e}")
\ No newline at end of file
+        log.error("Error optimizing image %s: %s", file_path, e)
+        remove_temp_files(tmp_path, webp_tmp_path)
+
+def replace_optimized(file_path, tmp_path, webp_tmp_path):
+    """Swap the optimized files in atomically, the WebP copy last"""
+    os.replace(tmp_path, file_path)
+    if os.path.exists(webp_tmp_path):
+        os.replace(webp_tmp_path, webp_variant_name(file_path))
+
+def remove_temp_files(*paths):
+    """Remove leftover temporary files from a failed optimization"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
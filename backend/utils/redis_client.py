@@ -0,0 +1,9 @@
+from redis import Redis
+from config import Config
+
+# Shared Redis connection (no socket is opened until the first command)
+redis_conn = Redis.from_url(
+    Config.REDIS_URL,
+    socket_connect_timeout=Config.REDIS_SOCKET_TIMEOUT,
+    socket_timeout=Config.REDIS_SOCKET_TIMEOUT
+)
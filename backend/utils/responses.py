@@ -0,0 +1,14 @@
+import orjson
+from flask import Response
+
+def dumps(payload):
+    """Serialize a payload to JSON bytes (ObjectId and other unknown types via str)"""
+    return orjson.dumps(payload, default=str, option=orjson.OPT_NAIVE_UTC)
+
+def ojson(payload, status=200):
+    """Build a JSON response using orjson instead of Flask's jsonify"""
+    return ojson_bytes(dumps(payload), status)
+
+def ojson_bytes(body, status=200):
+    """Build a JSON response from already serialized bytes"""
+    return Response(body, status=status, mimetype='application/json')
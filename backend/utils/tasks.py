@@ -0,0 +1,20 @@
+import logging
+import os
+from redis.exceptions import RedisError
+from rq import Queue
+from config import Config
+from utils.redis_client import redis_conn
+
+log = logging.getLogger(__name__)
+
+image_queue = Queue(Config.IMAGE_QUEUE, connection=redis_conn)
+
+def enqueue_optimize_image(file_path):
+    """Queue an uploaded image for optimization, return False if Redis is unavailable"""
+    try:
+        # Absolute path so the worker does not depend on its working directory
+        image_queue.enqueue('utils.file_handler.optimize_image', os.path.abspath(file_path))
+        return True
+    except RedisError as e:
+        log.warning("Error queueing image optimization: %s", e)
+        return False
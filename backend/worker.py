@@ -0,0 +1,11 @@
+from redis import Redis
+from rq import Worker
+from config import Config
+
+# Runs the background image optimization jobs:
+#   python worker.py
+if __name__ == '__main__':
+    # Separate connection without the short socket timeout used by the web
+    # app, since the worker blocks on Redis while waiting for jobs
+    connection = Redis.from_url(Config.REDIS_URL)
+    Worker([Config.IMAGE_QUEUE], connection=connection).work()
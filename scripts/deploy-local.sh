@@ -34,6 +34,7 @@ sleep 5
 kubectl apply -f k8s/backend-deployment.yaml
 kubectl apply -f k8s/frontend-deployment.yaml  
 kubectl apply -f k8s/mongo-deployment.yaml
+kubectl apply -f k8s/redis-deployment.yaml
 kubectl apply -f k8s/ingress.yaml
 
 # Wait for MongoDB to be ready first